@@ -1,58 +1,136 @@
 import re
-from typing import List, Dict
-from langchain_community.document_loaders import PyPDFLoader
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List, Dict, Optional
+import fitz  # PyMuPDF
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # 법령의 메타 데이터도 조문 안으로 들어가도록 설정하자
-def _pdf_to_text(path: str) -> str:
-    pdf_file = path
-    loader = PyPDFLoader(pdf_file)
-    pages = loader.load()
-    text_for_delete = r"법제처\s+\d+\s+국가법령정보센터\n개인정보 보호법"
-    law_text = "\n".join([re.sub(text_for_delete, "", p.page_content).strip() for p in pages])
-    
-    return law_text
+# 페이지마다 반복되는 법제처 머리글 제거용 기본 패턴
+_LAW_HEADER_PATTERN = r"법제처\s+\d+\s+국가법령정보센터\n개인정보 보호법"
+
+# 핫패스에서 매번 re.compile 하지 않도록 모듈 로드 시 한 번만 컴파일
+# 장/조/부칙 헤더를 하나의 교대 패턴으로 묶어 문서를 한 번만 스캔한다
+# (DOTALL + lookahead 패턴의 역추적 비용 제거)
+_SECTION_RE = re.compile(
+    r'^(?P<chap>제\d+장\s+[^\n]+)'
+    r'|(?P<art>제\d+조(?:의\d+)?\s*\([^)]+\))'
+    r'|^(?P<app>부칙)',
+    re.MULTILINE,
+)
+
+
+@lru_cache(maxsize=32)
+def _compile_pattern(pattern: str) -> "re.Pattern":
+    return re.compile(pattern)
+
+def pdf_to_text(path: str, clean_pattern: Optional[str] = _LAW_HEADER_PATTERN) -> str:
+    # PyPDFLoader보다 훨씬 빠른 PyMuPDF로 텍스트 추출 (문서를 한 번만 연다)
+    doc = fitz.open(path)
+    try:
+        texts = [page.get_text("text") for page in doc]
+    finally:
+        doc.close()
+
+    # 페이지별로 sub를 돌리지 않고 먼저 이어붙인 뒤 정규식을 한 번만 태운다
+    # (500페이지면 함수 호출/중간 문자열 500개가 1개로 줄어든다)
+    law_text = "\n".join(texts)
+    if clean_pattern:
+        law_text = _compile_pattern(clean_pattern).sub("", law_text)
+
+    return law_text.strip()
+
+def fast_chunk(text: str, chunk_size: int = 1000, chunk_overlap: int = 100) -> List[str]:
+    # RecursiveCharacterTextSplitter의 문자 단위 파이썬 루프 대신,
+    # '\n\n' 문단 경계를 NumPy 비교 한 번(C 루프)으로 전부 찾은 뒤
+    # 경계에 맞춰 그리디하게 chunk_size 바이트 창으로 묶는다.
+    # 파이썬 레벨 로직은 문자가 아니라 청크당 한 번만 돈다
+    data = text.encode("utf-8")
+    if len(data) <= chunk_size:
+        stripped = text.strip()
+        return [stripped] if stripped else []
+
+    arr = np.frombuffer(data, dtype=np.uint8)
+    breaks = np.flatnonzero((arr[:-1] == 10) & (arr[1:] == 10))  # b'\n\n' 위치
+    # 문단 시작 바이트 오프셋 (경계 탐색용, 오름차순)
+    starts = [0] + [int(b) + 2 for b in breaks] + [len(data)]
+
+    chunks: List[str] = []
+    cur = 0
+    while cur < len(data):
+        end = cur + chunk_size
+        if end >= len(data):
+            end = len(data)
+        else:
+            # chunk_size를 넘지 않는 마지막 문단 경계에서 자른다
+            # (문단 하나가 chunk_size보다 길면 그냥 바이트 위치에서 자름)
+            # 경계는 직전 청크 끝(cur + chunk_overlap)보다 뒤에 있어야 한다:
+            # 같은 경계를 다시 고르면 end가 1바이트씩만 전진하면서
+            # 동일한 꼬리 조각을 반복 방출하게 된다
+            boundary = starts[bisect_right(starts, end) - 1]
+            if boundary > cur + chunk_overlap:
+                end = boundary
+        # UTF-8 중간에서 잘린 바이트는 버린다
+        chunk = data[cur:end].decode("utf-8", errors="ignore").strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(data):
+            break
+        # 다음 청크는 overlap 바이트만큼 꼬리를 물고 시작
+        cur = max(end - chunk_overlap, cur + 1)
+    return chunks
+
+def iter_chunks(text: str, chunk_size: int = 1000, chunk_overlap: int = 100,
+                separators: Optional[List[str]] = None):
+    # 청크를 리스트로 모으지 않고 하나씩 내보낸다
+    # (파이프라인이 추출과 청킹을 겹칠 수 있도록)
+    if separators is None:
+        yield from fast_chunk(text, chunk_size, chunk_overlap)
+        return
+    # 커스텀 구분자가 오면 기존 LangChain 스플리터로 폴백
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=separators,
+    )
+    for chunk in splitter.split_text(text):
+        yield chunk
+
+def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 100) -> List[str]:
+    # LLM 추출 단위로 자르기 (문단 경계를 우선 존중)
+    return list(iter_chunks(text, chunk_size, chunk_overlap))
 
 def _parse_law(law_text):
-    # 서문 분리
-    # '^'로 시작하여 '제1장' 또는 '제1조' 직전까지의 모든 텍스트를 탐색 
-    preamble_pattern = r'^(.*?)(?=제1장|제1조)'
-    preamble = re.search(preamble_pattern, law_text, re.DOTALL)
-    if preamble:
-        preamble = preamble.group(1).strip()
-    
-    # 장 분리 
-    # '제X장' 형식의 제목과 그 뒤에 오는 모든 조항을 하나의 그룹화 
-    chapter_pattern = r'(제\d+장\s+.+?)\n((?:제\d+조(?:의\d+)?(?:\(\w+\))?.*?)(?=제\d+장|부칙|$))'
-    chapters = re.findall(chapter_pattern, law_text, re.DOTALL)
-    
-    # 부칙 분리
-    # '부칙'으로 시작하는 모든 텍스트를 탐색 
-    appendix_pattern = r'(부칙.*)'
-    appendix = re.search(appendix_pattern, law_text, re.DOTALL)
-    if appendix:
-        appendix = appendix.group(1)
-    
+    # 장/조/부칙 헤더를 _SECTION_RE로 한 번에 탐색하고,
+    # 헤더와 다음 헤더 사이 구간을 잘라 본문으로 사용한다 (단일 스캔)
+    matches = list(_SECTION_RE.finditer(law_text))
+
+    # 서문: 첫 헤더 이전의 모든 텍스트
+    preamble = law_text[:matches[0].start()].strip() if matches else None
+
     # 파싱 결과를 저장할 딕셔너리 초기화
-    parsed_law = {'서문': preamble, '장': {}, '부칙': appendix}
-    
-    # 각 장 내에서 조 분리
-    for chapter_title, chapter_content in chapters:
-        # 조 분리 패턴
-        # 1. '제X조'로 시작 ('제X조의Y' 형식도 가능)
-        # 2. 조 번호 뒤에 반드시 '(항목명)' 형식의 제목이 와야 함 
-        # 3. 다음 조가 시작되기 전까지 또는 문서의 끝까지의 모든 내용을 포함
-        article_pattern = r'(제\d+조(?:의\d+)?\s*\([^)]+\).*?)(?=제\d+조(?:의\d+)?\s*\([^)]+\)|$)'
-        
-        # 정규표현식을 이용해 모든 조항을 탐색 
-        articles = re.findall(article_pattern, chapter_content, re.DOTALL)
-        
-        # 각 조항의 앞뒤 공백을 제거하고 결과 딕셔너리에 저장
-        parsed_law['장'][chapter_title.strip()] = [article.strip() for article in articles]
+    parsed_law = {'서문': preamble, '장': {}, '부칙': None}
 
     law_list = []
+    current_chapter = None
+
+    for i, m in enumerate(matches):
+        if m.lastgroup == 'app':
+            # 부칙: 헤더부터 문서 끝까지 (부칙 내 조항은 수집하지 않음)
+            parsed_law['부칙'] = law_text[m.start():].strip()
+            break
 
-    for law in parsed_law["장"].keys():
-        for article in parsed_law["장"][law]:
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(law_text)
+
+        if m.lastgroup == 'chap':
+            # 장 제목: '제X장 ...' 한 줄
+            current_chapter = m.group('chap').strip()
+            parsed_law['장'][current_chapter] = []
+        elif m.lastgroup == 'art' and current_chapter is not None:
+            # 조: '제X조(항목명)' 헤더부터 다음 헤더 직전까지
+            article = law_text[m.start():end].strip()
+            parsed_law['장'][current_chapter].append(article)
             law_list.append(article)
-    
-    return law_list 
+
+    return law_list
@@ -1,21 +1,102 @@
-from neo4j import GraphDatabase
-import pandas as pd
+import csv
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import orjson
+from neo4j import Driver, GraphDatabase
+from neo4j.exceptions import Neo4jError
 
 # 1. 연결 설정
 uri = "bolt://localhost:7687"
-driver = GraphDatabase.driver(uri, auth=("neo4j", "password"))
-
-# 2. 데이터 가져오기 함수
-def get_data(tx):
-    query = "MATCH (n:User) RETURN n.id AS id, n.name AS name"
-    result = tx.run(query)
-    return [record.data() for record in result]
-
-# 3. 실행 및 CSV 저장
-with driver.session() as session:
-    data = session.read_transaction(get_data)
-    df = pd.read_json(json.dumps(data)) # 또는 바로 DataFrame 생성
-    df = pd.DataFrame(data)
-    df.to_csv("output.csv", index=False, encoding='utf-8-sig')
-
-driver.close()
+auth = ("neo4j", "password")
+
+# 세션당 Bolt 페치 크기 (RTT당 더 많은 레코드를 당겨온다)
+FETCH_SIZE = 10_000
+
+
+@lru_cache(maxsize=4)
+def _get_driver(driver_uri: str, user: str, password: str) -> Driver:
+    # 드라이버 생성은 Bolt 핸드셰이크/TLS 설정 비용이 있으므로 한 번만 하고 재사용
+    return GraphDatabase.driver(driver_uri, auth=(user, password))
+
+# 서버 측 배치 크기 (트랜잭션 메모리 한도 내에서 튜닝된 값)
+BATCH_SIZE = 20_000
+
+_ENTITY_QUERY = (
+    "MATCH (n) WHERE n.name IS NOT NULL "
+    "RETURN n.name AS name, labels(n)[0] AS type, properties(n) AS properties"
+)
+_RELATIONSHIP_QUERY = (
+    "MATCH (s)-[r]->(t) "
+    "RETURN s.name AS source, t.name AS target, type(r) AS type, properties(r) AS properties"
+)
+
+
+def _dump_cell(value) -> object:
+    # dict 프로퍼티를 CSV 한 칸에 넣기 위한 직렬화 (orjson: stdlib json보다 ~3배 빠름)
+    if isinstance(value, dict):
+        return orjson.dumps(value).decode()
+    return value
+
+
+def _export_query_to_csv(driver, query: str, columns, output_path: str,
+                         order_by: str, batch_size: int = BATCH_SIZE) -> None:
+    # 1) APOC이 설치되어 있으면 서버가 파일을 직접 쓴다
+    #    (전 그래프를 Bolt로 끌어와 파이썬에서 마샬링하는 비용 제거)
+    with driver.session(fetch_size=FETCH_SIZE) as session:
+        try:
+            session.run(
+                "CALL apoc.export.csv.query($q, $path, {batchSize: $batch, stream: false})",
+                q=query, path=str(Path(output_path).absolute()), batch=batch_size,
+            ).consume()
+            return
+        except Neo4jError:
+            pass  # APOC 미설치 → 클라이언트 측 배치로 폴백
+
+    # 2) 폴백: SKIP/LIMIT로 batch_size씩 나눠 받아 스트리밍 기록
+    #    ORDER BY 없는 SKIP/LIMIT은 실행마다 행 순서가 달라질 수 있어
+    #    페이지가 겹치거나 빠질 수 있다 → elementId로 순서를 고정한다
+    with driver.session(fetch_size=FETCH_SIZE) as session, \
+            open(output_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        skip = 0
+        while True:
+            count = 0
+            result = session.run(f"{query} ORDER BY {order_by} SKIP $skip LIMIT $limit",
+                                 skip=skip, limit=batch_size)
+            for record in result:
+                writer.writerow(tuple(_dump_cell(record[c]) for c in columns))
+                count += 1
+            if count < batch_size:
+                break
+            skip += batch_size
+
+
+def export_entities_to_csv(output_path: str = "entities.csv",
+                           driver: Optional[Driver] = None) -> None:
+    driver = driver or _get_driver(uri, *auth)
+    _export_query_to_csv(driver, _ENTITY_QUERY, ["name", "type", "properties"],
+                         output_path, order_by="elementId(n)")
+
+
+def export_relationships_to_csv(output_path: str = "relationships.csv",
+                                driver: Optional[Driver] = None) -> None:
+    driver = driver or _get_driver(uri, *auth)
+    _export_query_to_csv(driver, _RELATIONSHIP_QUERY,
+                         ["source", "target", "type", "properties"], output_path,
+                         order_by="elementId(r)")
+
+
+def main():
+    # 두 export가 드라이버(커넥션 풀)를 공유해 핸드셰이크를 한 번만 치른다
+    driver = _get_driver(uri, *auth)
+    export_entities_to_csv(driver=driver)
+    export_relationships_to_csv(driver=driver)
+    driver.close()
+    _get_driver.cache_clear()
+
+
+if __name__ == "__main__":
+    main()
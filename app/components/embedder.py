@@ -0,0 +1,55 @@
+from typing import List
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+
+
+class Embedder:
+    # 엔티티/청크 임베딩 생성기 (8GB VRAM 기준 최적화)
+
+    def __init__(self,
+                 model_name: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+                 batch_size: int = 32):
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.batch_size = batch_size
+        if self.device == "cuda":
+            # SDPA 융합 어텐션 커널 사용
+            self.model = SentenceTransformer(
+                model_name,
+                device=self.device,
+                model_kwargs={"attn_implementation": "sdpa"},
+            )
+            # 인코더 워크로드는 메모리 대역폭 바운드 → FP16 캐스팅으로
+            # 바이트가 절반이 되면서 처리량 ~2배, VRAM 사용 절반
+            self.model = self.model.half()
+            torch.backends.cuda.matmul.allow_tf32 = True
+        else:
+            # CPU 폴백 (CUDA 없는 개발/CI 환경): ONNX Runtime 백엔드가
+            # eager PyTorch 인코더보다 3~5배 빠르다 (optimum 필요)
+            try:
+                self.model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+            except (ImportError, ValueError):
+                self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, text: str) -> np.ndarray:
+        # 파이썬 리스트 변환(.tolist())은 차원 수만큼 PyFloat를 만들어낸다
+        # → numpy 배열 그대로 반환하고, 변환은 저장 경계에서 한 번만 한다
+        with torch.inference_mode():
+            embedding = self.model.encode(text, convert_to_numpy=True)
+        return embedding
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        # 배치는 가장 긴 문장에 맞춰 패딩되므로, 길이순으로 정렬해
+        # 비슷한 길이끼리 묶으면 짧은 엔티티명이 긴 청크 패딩을 낭비하지 않는다
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        with torch.inference_mode():
+            encoded = self.model.encode(
+                [texts[i] for i in order],
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+            )
+        # 원래 순서로 복원 (리스트 왕복 없이 (N, d) 행렬 그대로)
+        out = np.empty_like(encoded)
+        out[order] = encoded
+        return out
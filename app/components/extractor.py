@@ -0,0 +1,161 @@
+import asyncio
+import json
+import re
+from typing import Dict, List, Optional
+
+import orjson
+from langchain_core.exceptions import OutputParserException
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel, Field
+
+# 마크다운 펜스 제거 패턴은 호출마다 컴파일하지 않고 재사용
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*\})\s*```", re.DOTALL)
+
+
+class Entity(BaseModel):
+    name: str = Field(description="엔티티 이름")
+    type: str = Field(description="엔티티 타입 (예: 개념, 기관, 의무, 권리)")
+    properties: Dict = Field(default_factory=dict, description="추가 속성")
+
+
+class Relationship(BaseModel):
+    source: str = Field(description="출발 엔티티 이름")
+    target: str = Field(description="도착 엔티티 이름")
+    type: str = Field(description="관계 타입 (예: 규정한다, 적용된다)")
+    properties: Dict = Field(default_factory=dict, description="추가 속성")
+
+
+class KnowledgeGraph(BaseModel):
+    entities: List[Entity] = Field(default_factory=list)
+    relationships: List[Relationship] = Field(default_factory=list)
+
+
+class LLMExtractor:
+    # 텍스트 청크에서 엔티티/관계를 뽑아 KnowledgeGraph로 돌려준다
+
+    def __init__(self, llm=None):
+        self.llm = llm or ChatOpenAI(
+            model="gpt-4o-mini",
+            temperature=0,
+            # 청크마다 동일한 시스템 프리픽스가 제공자 프롬프트 캐시에 걸리도록 힌트
+            # (캐시 히트 시 비용 50~90% 절감 + TTFT 단축)
+            extra_body={"prompt_cache_key": "kg_extract_v1"},
+        )
+        # 툴콜링을 지원하는 모델이면 구조화 출력을 쓴다:
+        # 펜스 제거/json.loads/빈 그래프 재시도가 전부 사라지고,
+        # 스키마를 함수 정의로 넘기므로 프롬프트도 수백 토큰 짧아진다
+        try:
+            self.structured_llm = self.llm.with_structured_output(KnowledgeGraph)
+        except (NotImplementedError, AttributeError, ValueError):
+            self.structured_llm = None
+        self.extraction_prompt = self._create_extraction_prompt(
+            include_schema=self.structured_llm is None
+        )
+
+    def _create_extraction_prompt(self, include_schema: bool = True) -> ChatPromptTemplate:
+        system = "주어진 텍스트에서 엔티티와 관계를 추출하여 지식 그래프를 구성하세요."
+        if include_schema:
+            # 구조화 출력이 없는 모델용: 스키마를 프롬프트에 직접 넣는다
+            schema = json.dumps(KnowledgeGraph.model_json_schema(), ensure_ascii=False, indent=2)
+            system += (
+                "\n아래 JSON 스키마를 따르는 JSON 객체만 출력하세요. 다른 설명은 쓰지 마세요.\n\n"
+                + schema
+            ).replace("{", "{{").replace("}", "}}")
+        # 변하는 {text}는 항상 맨 끝에 둔다: 앞부분(시스템+스키마)이 호출마다
+        # 바이트 단위로 동일해야 캐시된 프리픽스가 재사용된다
+        return ChatPromptTemplate.from_messages([
+            ("system", system),
+            ("human", "{text}"),
+        ])
+
+    def _parse_response(self, content: str) -> KnowledgeGraph:
+        # 모델이 마크다운 펜스로 감싸서 줄 때가 있어 JSON 본문만 잘라낸다
+        match = _FENCE_RE.search(content)
+        if match:
+            content = match.group(1)
+        try:
+            # orjson: stdlib json보다 2~6배 빠르고 UTF-8 바이트를 바로 받는다
+            data = orjson.loads(content.encode() if isinstance(content, str) else content)
+            return KnowledgeGraph(**data)
+        except (orjson.JSONDecodeError, ValueError):
+            # 파싱 실패한 청크는 빈 그래프로 처리하고 넘어간다
+            return KnowledgeGraph()
+
+    def extract(self, text: str) -> KnowledgeGraph:
+        if self.structured_llm is not None:
+            chain = self.extraction_prompt | self.structured_llm
+            # 폴백 경로와 같은 의미론: 툴콜이 깨진 청크는 빈 그래프로 넘어간다
+            # (한 청크 때문에 문서 전체 배치가 죽지 않도록)
+            try:
+                result = chain.invoke({"text": text})
+            except OutputParserException:
+                result = None
+            return result if result is not None else KnowledgeGraph()
+        chain = self.extraction_prompt | self.llm
+        response = chain.invoke({"text": text})
+        return self._parse_response(response.content)
+
+    def extract_batch(self, texts: List[str]) -> List[KnowledgeGraph]:
+        return [self.extract(text) for text in texts]
+
+    async def aextract(self, text: str) -> KnowledgeGraph:
+        if self.structured_llm is not None:
+            chain = self.extraction_prompt | self.structured_llm
+            # extract()와 동일: 파싱 실패 청크는 빈 그래프로 처리
+            try:
+                result = await chain.ainvoke({"text": text})
+            except OutputParserException:
+                result = None
+            return result if result is not None else KnowledgeGraph()
+        chain = self.extraction_prompt | self.llm
+        response = await chain.ainvoke({"text": text})
+        return self._parse_response(response.content)
+
+    async def aextract_batch(self, texts: List[str],
+                             concurrency: int = 16) -> List[KnowledgeGraph]:
+        # 추출은 순수 네트워크 대기라 동시 요청으로 처리량이 API 한도까지 늘어난다
+        # 세마포어로 제공자 rate limit 안에서만 동시 실행
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(text: str) -> KnowledgeGraph:
+            async with sem:
+                return await self.aextract(text)
+
+        return await asyncio.gather(*(one(text) for text in texts))
+
+
+class GraphMerger:
+    # 청크 그래프를 도착하는 대로 합치는 증분 병합기
+    # (모든 청크 그래프를 모아둘 필요 없이 하나씩 add 하면 된다)
+
+    __slots__ = ("graph", "_entity_map", "_seen_rels")
+
+    def __init__(self):
+        self.graph = KnowledgeGraph()
+        self._entity_map: Dict[str, Entity] = {}
+        self._seen_rels = set()
+
+    def add(self, kg: KnowledgeGraph) -> None:
+        for entity in kg.entities:
+            existing = self._entity_map.get(entity.name)
+            if existing is None:
+                self._entity_map[entity.name] = entity
+                self.graph.entities.append(entity)
+            else:
+                # 이미 검증된 모델끼리의 병합이라 __dict__에 직접 써서
+                # Pydantic 필드 검증을 건너뛴다 (속성 수에 비례하는 비용 제거)
+                existing.__dict__["properties"] = {**existing.properties, **entity.properties}
+        for rel in kg.relationships:
+            key = (rel.source, rel.target, rel.type)
+            if key not in self._seen_rels:
+                self._seen_rels.add(key)
+                self.graph.relationships.append(rel)
+
+
+def merge_knowledge_graphs(graphs: List[KnowledgeGraph]) -> KnowledgeGraph:
+    # 청크별 그래프를 합치고 이름이 같은 엔티티/중복 관계를 한 번의 순회로 정리한다
+    merger = GraphMerger()
+    for graph in graphs:
+        merger.add(graph)
+    return merger.graph
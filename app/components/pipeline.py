@@ -0,0 +1,100 @@
+import asyncio
+import functools
+import logging
+from typing import Dict, List, Optional
+
+from tqdm import tqdm
+
+from chunking import iter_chunks, pdf_to_text
+from embedder import Embedder
+from extractor import GraphMerger, KnowledgeGraph, LLMExtractor
+from store_neo4j import Neo4jStorage
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeGraphPipeline:
+    # PDF/텍스트 → 청킹 → LLM 추출 → 임베딩 → Neo4j 저장
+
+    def __init__(self, extractor: Optional[LLMExtractor] = None,
+                 embedder: Optional[Embedder] = None,
+                 storage: Optional[Neo4jStorage] = None):
+        self.extractor = extractor or LLMExtractor()
+        self.embedder = embedder or Embedder()
+        self.storage = storage or Neo4jStorage()
+        # 같은 질의 텍스트가 반복되면 (자동완성/반복 검색) GPU 포워드 대신
+        # 캐시에서 꺼낸다. lru_cache 키로 쓰려면 반환이 해시 가능해야 해서 tuple
+        # (.tolist()로 파이썬 float을 캐시한다: np.float32는 Bolt 패커가 거부)
+        self._embed_query = functools.lru_cache(maxsize=1024)(
+            lambda text: tuple(self.embedder.embed(text).tolist())
+        )
+
+    async def aprocess_text(self, text: str, concurrency: int = 16) -> KnowledgeGraph:
+        # 청킹·추출·병합을 스트리밍으로 겹친다: 청크가 만들어지는 대로 워커가
+        # 집어가 추출하고, 결과 그래프는 도착 즉시 병합된다.
+        # 중간 산출물을 전부 들고 있지 않으므로 피크 메모리는 O(concurrency)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        merger = GraphMerger()
+        # 청크마다 print로 stdout을 플러시하면 핫루프가 커널 쓰기에 막힌다
+        # → 제자리 갱신되는 진행바 하나로 대체
+        pbar = tqdm(desc="extract", unit="chunk")
+
+        async def produce():
+            for chunk in iter_chunks(text):
+                await queue.put(chunk)
+            for _ in range(concurrency):
+                await queue.put(None)  # 워커 종료 신호
+
+        async def work():
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    return
+                merger.add(await self.extractor.aextract(chunk))
+                pbar.update(1)
+                pbar.set_postfix(entities=len(merger.graph.entities))
+
+        try:
+            await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+        finally:
+            pbar.close()
+
+        merged = merger.graph
+        logger.info("엔티티 %d개, 관계 %d개 추출", len(merged.entities), len(merged.relationships))
+
+        names = [entity.name for entity in merged.entities]
+        embeddings: Dict[str, object] = {}
+        if names:
+            vectors = self.embedder.embed_batch(names)
+            embeddings = {name: vectors[i] for i, name in enumerate(names)}
+
+        # UNWIND 일괄 쓰기에 바로 넣을 수 있는 행 리스트로 만들어 전달
+        entity_rows = [
+            {"name": e.name, "type": e.type, "properties": e.properties,
+             "embedding": embeddings.get(e.name)}
+            for e in merged.entities
+        ]
+        rel_rows = [
+            {"source": r.source, "target": r.target, "type": r.type,
+             "properties": r.properties}
+            for r in merged.relationships
+        ]
+        self.storage.store_batch(entity_rows, rel_rows)
+        logger.info("Neo4j 저장 완료")
+        return merged
+
+    def process_text(self, text: str) -> KnowledgeGraph:
+        return asyncio.run(self.aprocess_text(text))
+
+    def process_pdf(self, path: str) -> KnowledgeGraph:
+        return self.process_text(pdf_to_text(path))
+
+    def find_similar_entities(self, query_text: str, limit: int = 10,
+                              threshold: float = 0.7) -> List[Dict]:
+        embedding = list(self._embed_query(query_text))
+        return self.storage.find_similar_entities(embedding, limit=limit,
+                                                  threshold=threshold)
+
+    def close(self):
+        self._embed_query.cache_clear()
+        self.storage.close()
@@ -0,0 +1,659 @@
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from neo4j import Bookmarks, GraphDatabase
+from neo4j.exceptions import Neo4jError, TransientError
+
+from extractor import KnowledgeGraph
+
+logger = logging.getLogger(__name__)
+
+_REL_TYPE_TRANS = str.maketrans(" -", "__")
+
+
+@functools.lru_cache(maxsize=1024)
+def _sanitize_rel_type(rel_type: str) -> str:
+    # 관계 타입은 종류가 적고 같은 값이 수만 번 반복된다 → 메모이즈
+    # (translate는 replace 두 번과 달리 C 레벨 단일 패스)
+    return rel_type.upper().translate(_REL_TYPE_TRANS)
+
+
+@functools.lru_cache(maxsize=1024)
+def _quote_label(label: str) -> str:
+    # LLM이 뽑은 타입에는 공백/하이픈/숫자 시작이 흔하다 → 백틱으로 감싸
+    # (내부 백틱은 두 배로) 어떤 문자열이든 유효한 Cypher 라벨로 만든다
+    return "`" + label.replace("`", "``") + "`"
+
+
+def normalize_embedding(vec):
+    # 기록 시 한 번 L2 정규화해 두면 코사인 = 내적이 되어
+    # 조회 때 행별 노름 계산과 나눗셈이 사라진다 (GEMV 한 번으로 끝)
+    v = np.asarray(vec, dtype=np.float32)
+    return v / (np.linalg.norm(v) + 1e-12)
+
+
+def quantize_embedding(vec):
+    # 벡터별 스케일 int8 양자화: 저장/전송 바이트가 1/4로 줄고,
+    # 코사인 품질 손실은 ~0.5% 이내
+    v = np.asarray(vec, dtype=np.float32)
+    scale = float(np.max(np.abs(v))) / 127.0 if v.size else 1.0
+    if scale == 0.0:
+        scale = 1.0
+    q = np.round(v / scale).astype(np.int8)
+    return q, scale
+
+
+class Neo4jStorage:
+    # 추출된 지식 그래프를 Neo4j에 저장/조회한다
+
+    def __init__(self, uri: str = "bolt://localhost:7687",
+                 user: str = "neo4j", password: str = "password",
+                 max_connection_pool_size: Optional[int] = None,
+                 connection_acquisition_timeout: float = 60.0,
+                 max_connection_lifetime: float = 3600.0,
+                 keep_alive: bool = True,
+                 max_transaction_retry_time: float = 30.0,
+                 quantize_embeddings: bool = False):
+        # 동시 파이프라인 워커 수만큼 Bolt 커넥션이 필요하므로 풀 크기를 노출한다
+        # (기본 max(16, 2*CPU), NEO4J_POOL_SIZE 환경변수로도 덮어쓰기 가능)
+        if max_connection_pool_size is None:
+            max_connection_pool_size = int(
+                os.environ.get("NEO4J_POOL_SIZE", max(16, 2 * (os.cpu_count() or 1)))
+            )
+        self.pool_size = max_connection_pool_size
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=max_connection_pool_size,
+            connection_acquisition_timeout=connection_acquisition_timeout,
+            max_connection_lifetime=max_connection_lifetime,
+            keep_alive=keep_alive,
+            max_transaction_retry_time=max_transaction_retry_time,
+        )
+        self._vector_index_ready = False
+        self._constraints_ready = False
+        self._apoc_available: Optional[bool] = None
+        # True면 임베딩을 e.embedding_q8(int8)+e.embedding_scale로 저장한다
+        # (서버 벡터 인덱스는 float 리스트가 필요하므로 이때 조회는 클라이언트 측)
+        self.quantize_embeddings = quantize_embeddings
+        # 브루트포스 폴백용 SoA 캐시: (N, d) 행렬 + 이름 배열 (+양자화 시 스케일/노름)
+        self._emb_matrix = None
+        self._emb_names: Optional[List[str]] = None
+        self._emb_scales = None
+        self._emb_norms = None
+        # build_ann_index()로 만드는 선택적 클라이언트 측 ANN 인덱스
+        self._ann = None
+        # 연결 검증은 첫 사용 시로 미룬다 (조회 없이 끝나는 프로세스가
+        # 생성자에서 Bolt 핸드셰이크 왕복을 치르지 않도록)
+        self._verified = False
+
+    def _ensure_connected(self):
+        if self._verified:
+            return
+        # 실패하면 그대로 전파한다: 호출부가 print에 가려진 채
+        # 죽은 커넥션으로 진행하는 것보다 낫다
+        self.driver.verify_connectivity()
+        logger.info("Neo4j 연결 성공")
+        self._verified = True
+
+    def close(self):
+        self.driver.close()
+
+    def _ensure_constraints(self, session=None):
+        # 이름 조회(MERGE/MATCH by name)가 전체 스캔이 되지 않도록
+        # 공용 :Entity 라벨에 유니크 제약(인덱스 동반)을 최초 쓰기 전에 걸어둔다
+        if self._constraints_ready:
+            return
+        cypher = ("CREATE CONSTRAINT entity_name IF NOT EXISTS "
+                  "FOR (n:Entity) REQUIRE n.name IS UNIQUE")
+        try:
+            if session is not None:
+                session.run(cypher).consume()
+            else:
+                with self.driver.session() as s:
+                    s.run(cypher).consume()
+        except Neo4jError:
+            pass  # 구버전 서버: 제약 없이 진행
+        self._constraints_ready = True
+
+    def _has_apoc(self) -> bool:
+        # 라벨/관계 타입을 파라미터로 넘길 수 있는지 (f-string 라벨은 타입마다
+        # 쿼리 문자열이 달라져 플랜 캐시를 깨뜨린다) 한 번만 확인해 둔다
+        if self._apoc_available is None:
+            try:
+                with self.driver.session() as session:
+                    session.run("RETURN apoc.version()").consume()
+                self._apoc_available = True
+            except Neo4jError:
+                self._apoc_available = False
+        return self._apoc_available
+
+    @contextmanager
+    def batch(self):
+        # 여러 create_* 호출을 한 세션·한 트랜잭션으로 묶는다:
+        # with storage.batch() as tx: storage.create_entity(..., tx=tx)
+        # 호출당 세션 생성/커밋 고정비용(수십 ms)이 한 번으로 줄어든다
+        self._ensure_connected()
+        with self.driver.session() as session:
+            with session.begin_transaction() as tx:
+                yield tx
+                tx.commit()
+
+    def create_entity(self, name: str, entity_type: str,
+                      properties: Optional[Dict] = None, embedding=None, tx=None):
+        properties = properties or {}
+        self._ensure_connected()
+        self._ensure_constraints()
+        if self._has_apoc():
+            # 라벨을 파라미터로: 어떤 타입이 와도 같은 쿼리 문자열 → 플랜 재사용
+            query = ("CALL apoc.merge.node([$label, 'Entity'], {name: $name}, "
+                     "$properties, $properties) YIELD node AS e")
+            params = {"label": entity_type, "name": name, "properties": properties}
+        else:
+            query = (f"MERGE (e:{_quote_label(entity_type)} {{name: $name}}) "
+                     "SET e:Entity, e += $properties")
+            params = {"name": name, "properties": properties}
+        if embedding is not None:
+            embedding = normalize_embedding(embedding)
+            if self.quantize_embeddings:
+                q, scale = quantize_embedding(embedding)
+                query += (" SET e.embedding_q8 = $embedding_q8, "
+                          "e.embedding_scale = $scale, e.embedding_normed = true")
+                params.update(embedding_q8=q.tolist(), scale=scale)
+            else:
+                # numpy 배열은 드라이버 경계에서만 리스트로 변환
+                query += " SET e.embedding = $embedding, e.embedding_normed = true"
+                params["embedding"] = embedding.tolist()
+        if self._has_apoc():
+            query += " RETURN count(e)"
+        if embedding is not None:
+            self._invalidate_embedding_cache()
+        if tx is not None:
+            tx.run(query, **params)
+            return
+        with self.driver.session() as session:
+            # 트랜잭션 함수: 일시적 오류/리더 교체 시 드라이버가 알아서 재시도
+            session.execute_write(lambda t: t.run(query, **params).consume())
+
+    def create_relationship(self, source_name: str, target_name: str,
+                            rel_type: str, properties: Optional[Dict] = None, tx=None):
+        properties = properties or {}
+        self._ensure_connected()
+        rel_type = _sanitize_rel_type(rel_type)
+        if self._has_apoc():
+            # 관계 타입도 파라미터로 넘겨 타입 수와 무관하게 플랜 하나를 재사용
+            # :Entity 라벨을 명시해 유니크 제약 인덱스로 양끝 노드를 찾는다
+            query = (
+                "MATCH (s:Entity {name: $source_name}) "
+                "MATCH (t:Entity {name: $target_name}) "
+                "CALL apoc.merge.relationship(s, $rel_type, {}, $properties, t) "
+                "YIELD rel RETURN count(rel)"
+            )
+            params = {"source_name": source_name, "target_name": target_name,
+                      "rel_type": rel_type, "properties": properties}
+        else:
+            query = (
+                f"MATCH (s:Entity {{name: $source_name}}) "
+                f"MATCH (t:Entity {{name: $target_name}}) "
+                f"MERGE (s)-[r:{rel_type}]->(t) SET r += $properties"
+            )
+            params = {"source_name": source_name, "target_name": target_name,
+                      "properties": properties}
+        if tx is not None:
+            tx.run(query, **params)
+            return
+        with self.driver.session() as session:
+            # 트랜잭션 함수: 일시적 오류/리더 교체 시 드라이버가 알아서 재시도
+            session.execute_write(lambda t: t.run(query, **params).consume())
+
+    def store_knowledge_graph(self, kg: KnowledgeGraph,
+                              embeddings: Optional[Dict] = None):
+        # 행 단위 create_* 루프는 건당 세션+왕복+커밋이라 일괄 경로로 위임
+        self.store_knowledge_graph_bulk(kg, embeddings)
+
+    def store_knowledge_graph_bulk(self, kg: KnowledgeGraph,
+                                   embeddings: Optional[Dict] = None,
+                                   batch_size: int = 20_000):
+        embeddings = embeddings or {}
+        entity_rows = [
+            {"name": e.name, "type": e.type, "properties": e.properties,
+             "embedding": embeddings.get(e.name)}
+            for e in kg.entities
+        ]
+        rel_rows = [
+            {"source": r.source, "target": r.target, "type": r.type,
+             "properties": r.properties}
+            for r in kg.relationships
+        ]
+        self.store_batch(entity_rows, rel_rows, batch_size)
+
+    def store_batch(self, entity_rows: List[Dict], rel_rows: List[Dict],
+                    batch_size: int = 20_000):
+        # 행 리스트를 UNWIND 한 방으로 보낸다: N건 개별 왕복 → 타입당 1회 왕복
+        # (트랜잭션 메모리 한도 안에 머물도록 batch_size 단위로 쪼갬)
+        self._ensure_connected()
+        with self.driver.session() as session:
+            self._ensure_constraints(session)
+            # 임베딩이 있으면 서버 측 벡터 인덱스를 한 번 만들어 둔다
+            dims = next(
+                (len(row["embedding"]) for row in entity_rows
+                 if row.get("embedding") is not None),
+                None,
+            )
+            if dims:
+                if not self.quantize_embeddings:
+                    # 양자화 저장 시에는 float 리스트가 없어 서버 인덱스를 못 쓴다
+                    self._ensure_vector_index(session, dims)
+                self._invalidate_embedding_cache()
+
+        # 임베딩 없는 행은 건드리지 않는다: SET e.embedding = null은 Cypher에서
+        # 프로퍼티 '삭제'라서, 가드 없이는 재병합 때 기존 임베딩이 지워진다
+        # (normed 플래그도 임베딩이 실제로 들어가는 행에만 찍는다)
+        if self.quantize_embeddings:
+            emb_clause = (
+                "e.embedding_q8 = coalesce(row.embedding_q8, e.embedding_q8), "
+                "e.embedding_scale = coalesce(row.embedding_scale, e.embedding_scale), "
+                "e.embedding_normed = CASE WHEN row.embedding_q8 IS NULL "
+                "THEN e.embedding_normed ELSE true END"
+            )
+        else:
+            emb_clause = (
+                "e.embedding = coalesce(row.embedding, e.embedding), "
+                "e.embedding_normed = CASE WHEN row.embedding IS NULL "
+                "THEN e.embedding_normed ELSE true END"
+            )
+
+        # (UNWIND 본문, 전체 행) 작업 목록을 만들고 스레드 풀로 병렬 실행한다
+        # 배치 분할은 _run_write_jobs가 페이로드 크기에 따라 결정한다
+        entity_jobs: List[tuple] = []
+        rel_jobs: List[tuple] = []
+
+        if self._has_apoc():
+            # 라벨/타입이 행 데이터로 들어가는 단일 파라미터화 쿼리:
+            # 타입 수와 무관하게 그룹화 없이 플랜 하나로 전부 처리
+            entity_body = (
+                "CALL apoc.merge.node([row.type, 'Entity'], {name: row.name}, "
+                "row.properties, row.properties) YIELD node AS e "
+                f"SET {emb_clause} RETURN count(e) AS c"
+            )
+            entity_jobs.append((entity_body,
+                                [self._entity_row_params(row)
+                                 for row in entity_rows]))
+
+            rel_body = (
+                "MATCH (s:Entity {name: row.source}) "
+                "MATCH (t:Entity {name: row.target}) "
+                "CALL apoc.merge.relationship(s, row.rel_type, {}, "
+                "row.properties, t) YIELD rel RETURN count(rel) AS c"
+            )
+            rel_jobs.append((rel_body,
+                             [{**row, "rel_type": _sanitize_rel_type(row["type"])}
+                              for row in rel_rows]))
+        else:
+            # APOC 없음: 라벨은 Cypher에서 정적이어야 하므로 타입별로 묶는다
+            by_label: Dict[str, List[Dict]] = {}
+            for row in entity_rows:
+                by_label.setdefault(row["type"], []).append(row)
+            for label, rows in by_label.items():
+                # 공용 :Entity 라벨을 같이 붙여 벡터 인덱스 하나로 전 타입을 커버한다
+                entity_body = (
+                    f"MERGE (e:{_quote_label(label)} {{name: row.name}}) "
+                    f"SET e:Entity, e += row.properties, {emb_clause} "
+                    "RETURN count(e) AS c"
+                )
+                entity_jobs.append((entity_body,
+                                    [self._entity_row_params(row) for row in rows]))
+
+            # 관계 타입도 마찬가지로 타입별로 묶어서 보낸다
+            by_type: Dict[str, List[Dict]] = {}
+            for row in rel_rows:
+                by_type.setdefault(_sanitize_rel_type(row["type"]), []).append(row)
+            for rel_type, rows in by_type.items():
+                rel_body = (
+                    "MATCH (s:Entity {name: row.source}) "
+                    "MATCH (t:Entity {name: row.target}) "
+                    f"MERGE (s)-[r:{rel_type}]->(t) SET r += row.properties "
+                    "RETURN count(r) AS c"
+                )
+                rel_jobs.append((rel_body, rows))
+
+        # 관계는 양끝 노드가 먼저 있어야 하므로, 엔티티 쓰기가 전부 끝난
+        # 북마크 이후로 인과 순서를 걸고 나서 쓴다
+        bookmarks = self._run_write_jobs(entity_jobs, batch_size=batch_size)
+        self._run_write_jobs(rel_jobs, bookmarks=bookmarks, batch_size=batch_size)
+
+    def _run_write_jobs(self, jobs: List[tuple],
+                        bookmarks: Optional[Bookmarks] = None,
+                        batch_size: int = 20_000) -> Bookmarks:
+        # 단일 세션 직렬 쓰기는 다코어 서버를 포화시키지 못한다 → 그룹마다
+        # 워커 스레드가 자기 세션(풀의 커넥션 하나)으로 UNWIND를 실행한다
+        combined = Bookmarks()
+        if bookmarks:
+            combined += bookmarks
+        if not jobs:
+            return combined
+
+        def run(job):
+            body, rows = job
+            with self.driver.session(bookmarks=bookmarks) as session:
+                if len(rows) > batch_size:
+                    # 대량 페이로드: 전 행을 한 요청으로 보내고 서버가
+                    # batch_size행마다 커밋한다 (WAL fsync를 배치당 1회로 상각).
+                    # CALL { } IN TRANSACTIONS는 암시적 트랜잭션에서만 돌므로
+                    # execute_write 대신 session.run을 쓴다
+                    query = ("UNWIND $rows AS row CALL { WITH row " + body +
+                             f" }} IN TRANSACTIONS OF {int(batch_size)} ROWS "
+                             "RETURN sum(c) AS c")
+                    # 병렬 관계 잡은 양끝 노드 락을 공유하므로 충돌 시
+                    # TransientError가 난다. 암시적 트랜잭션은 드라이버가
+                    # 재시도해 주지 않아 직접 재시도한다
+                    # (본문이 MERGE라 이미 커밋된 내부 배치는 멱등)
+                    for attempt in range(3):
+                        try:
+                            session.run(query, rows=rows).consume()
+                            break
+                        except TransientError:
+                            if attempt == 2:
+                                raise
+                            time.sleep(0.5 * (attempt + 1))
+                else:
+                    query = "UNWIND $rows AS row " + body
+                    session.execute_write(
+                        lambda t: t.run(query, rows=rows).consume())
+                return session.last_bookmarks()
+
+        if len(jobs) == 1:
+            combined += run(jobs[0])
+            return combined
+        with ThreadPoolExecutor(max_workers=min(self.pool_size, len(jobs))) as pool:
+            for bm in pool.map(run, jobs):
+                combined += bm
+        return combined
+
+    def _entity_row_params(self, row: Dict) -> Dict:
+        # 드라이버 경계: numpy → 리스트, 양자화 모드면 int8+scale로 변환
+        embedding = row.get("embedding")
+        if embedding is None:
+            return row
+        embedding = normalize_embedding(embedding)
+        if self.quantize_embeddings:
+            q, scale = quantize_embedding(embedding)
+            out = {k: v for k, v in row.items() if k != "embedding"}
+            out["embedding_q8"] = q.tolist()
+            out["embedding_scale"] = scale
+            return out
+        return {**row, "embedding": embedding.tolist()}
+
+    def _ensure_vector_index(self, session, dimensions: int):
+        # HNSW 벡터 인덱스: 코사인 브루트포스 O(n·d)를 서버 측 ANN 조회로 대체
+        if self._vector_index_ready:
+            return
+        try:
+            session.run(
+                "CREATE VECTOR INDEX entity_embeddings IF NOT EXISTS "
+                "FOR (e:Entity) ON (e.embedding) "
+                "OPTIONS {indexConfig: {"
+                f"`vector.dimensions`: {int(dimensions)}, "
+                "`vector.similarity_function`: 'cosine'}}"
+            ).consume()
+            self._vector_index_ready = True
+        except Neo4jError:
+            # 벡터 인덱스를 지원하지 않는 서버: 브루트포스 폴백을 쓴다
+            pass
+
+    def query(self, cypher: str, params: Optional[Dict] = None) -> List[Dict]:
+        self._ensure_connected()
+        with self.driver.session() as session:
+            return session.execute_read(
+                lambda tx: [record.data() for record in tx.run(cypher, params or {})]
+            )
+
+    def query_columns(self, cypher: str, params: Optional[Dict] = None,
+                      columns: Optional[List[str]] = None) -> List[tuple]:
+        # record.data()는 행마다 문자열 키 dict를 만든다. 읽을 컬럼이 정해져
+        # 있으면 튜플로 받아 행당 dict 할당을 통째로 없앤다
+        self._ensure_connected()
+        with self.driver.session() as session:
+            if columns:
+                return session.execute_read(
+                    lambda tx: [tuple(record[c] for c in columns)
+                                for record in tx.run(cypher, params or {})]
+                )
+            return session.execute_read(
+                lambda tx: [record.values() for record in tx.run(cypher, params or {})]
+            )
+
+    def iter_query(self, cypher: str, params: Optional[Dict] = None,
+                   columns: Optional[List[str]] = None):
+        # 결과 전체를 리스트+dict로 물질화하지 않고 레코드가 도착하는 대로 내보낸다
+        # (대량 결과에서 피크 메모리를 결과 크기의 절반 이하로)
+        # columns를 주면 행당 dict 대신 튜플을 내보낸다
+        self._ensure_connected()
+        with self.driver.session() as session:
+            result = session.run(cypher, params or {})
+            if columns:
+                for record in result:
+                    yield tuple(record[c] for c in columns)
+            else:
+                for record in result:
+                    yield record.data()
+
+    def get_entity_by_name(self, name: str) -> Optional[Dict]:
+        results = self.query(
+            "MATCH (n {name: $name}) RETURN n.name AS name, labels(n)[0] AS type, "
+            "properties(n) AS properties",
+            {"name": name},
+        )
+        return results[0] if results else None
+
+    def get_entities_by_names(self, names: List[str]) -> List[Dict]:
+        # 이름 N개를 한 번의 왕복으로 조회한다
+        # (get_entity_by_name 루프는 이름당 세션+왕복 비용이 든다)
+        return self.query(
+            "UNWIND $names AS nm MATCH (n {name: nm}) "
+            "RETURN n.name AS name, labels(n)[0] AS type, "
+            "properties(n) AS properties",
+            {"names": names},
+        )
+
+    def get_relationships(self, source_name: Optional[str] = None,
+                          target_name: Optional[str] = None,
+                          limit: int = 100) -> List[Dict]:
+        # 필터 조합마다 쿼리 문자열을 따로 만들지 않고 널 허용 파라미터
+        # 하나로 처리한다: 문자열이 항상 같아 서버 플랜 캐시가 재사용된다
+        return self.query(
+            "MATCH (s)-[r]->(t) "
+            "WHERE ($source_name IS NULL OR s.name = $source_name) "
+            "AND ($target_name IS NULL OR t.name = $target_name) "
+            "RETURN s.name AS source, t.name AS target, type(r) AS type, "
+            "properties(r) AS properties LIMIT $limit",
+            {"source_name": source_name, "target_name": target_name,
+             "limit": limit},
+        )
+
+    def find_similar_entities(self, query_embedding, limit: int = 10,
+                              threshold: float = 0.7) -> List[Dict]:
+        if hasattr(query_embedding, "tolist"):
+            query_embedding = query_embedding.tolist()
+        # 0) 구축돼 있으면 클라이언트 측 ANN 인덱스가 가장 빠르다 (왕복 없음)
+        if self._ann is not None:
+            names, _ = self._load_embedding_cache()
+            labels, distances = self._ann.knn_query(query_embedding,
+                                                    k=min(limit, len(names)))
+            return [
+                {"name": names[int(i)], "similarity": float(1.0 - d)}
+                for i, d in zip(labels[0], distances[0])
+                if 1.0 - d >= threshold
+            ]
+        # 양자화 저장 모드: 서버에는 float 임베딩이 없으므로 클라이언트 측 경로만
+        if self.quantize_embeddings:
+            query_norm = sum(x * x for x in query_embedding) ** 0.5
+            if query_norm == 0:
+                return []
+            return self._brute_force_similar(query_embedding, query_norm,
+                                             limit, threshold)
+        # 1) 서버 측 HNSW 벡터 인덱스: 임베딩을 클라이언트로 내려받지 않고
+        #    인덱스가 sub-linear 시간에 top-k를 돌려준다.
+        #    인덱스 score는 (1+cos)/2로 [0,1] 정규화돼 있으므로 임계값을
+        #    같은 스케일로 올리고, 반환은 다른 경로와 같은 raw cosine으로 되돌린다
+        try:
+            return self.query(
+                "CALL db.index.vector.queryNodes('entity_embeddings', $k, $embedding) "
+                "YIELD node, score WHERE score >= $threshold "
+                "RETURN node.name AS name, 2 * score - 1 AS similarity",
+                {"k": limit, "embedding": query_embedding,
+                 "threshold": (threshold + 1) / 2},
+            )
+        except Neo4jError:
+            # 인덱스가 없는 서버는 아래 폴백으로
+            pass
+
+        # 2) 벡터 인덱스 없이도 코사인을 Cypher에서 계산해 한 번의 왕복으로
+        #    top-k만 받는다 (N×d 임베딩 전송과 파이썬 행 단위 루프 제거)
+        query_norm = sum(x * x for x in query_embedding) ** 0.5
+        if query_norm == 0:
+            return []
+        try:
+            return self.query(
+                "MATCH (n) WHERE n.embedding IS NOT NULL "
+                "WITH n, REDUCE(s = 0.0, i IN range(0, size($q) - 1) | "
+                "s + n.embedding[i] * $q[i]) AS dot, "
+                "SQRT(REDUCE(s = 0.0, x IN n.embedding | s + x * x)) AS nn "
+                "WITH n, dot / (nn * $qn) AS similarity WHERE similarity >= $threshold "
+                "RETURN n.name AS name, similarity ORDER BY similarity DESC LIMIT $k",
+                {"q": query_embedding, "qn": query_norm,
+                 "threshold": threshold, "k": limit},
+            )
+        except Neo4jError:
+            # 아주 오래된 서버만 여기로 온다: 파이썬 브루트포스 폴백
+            pass
+
+        return self._brute_force_similar(query_embedding, query_norm, limit, threshold)
+
+    def _load_embedding_cache(self):
+        # 호출할 때마다 전체 임베딩을 다시 받아 파싱하지 않도록,
+        # 한 번만 당겨와 float32 SoA 행렬로 캐시한다 (쓰기 시 무효화)
+        if self._emb_matrix is None:
+            prop = "embedding_q8" if self.quantize_embeddings else "embedding"
+            # 행 수를 먼저 세서 행렬을 최종 크기로 할당해 두고,
+            # 레코드를 스트리밍으로 받아 행 단위로 채운다
+            # (전체 결과를 dict 리스트로 물질화한 뒤 vstack하는 것보다 피크 메모리 절반)
+            count = self.query(
+                f"MATCH (n) WHERE n.{prop} IS NOT NULL RETURN count(n) AS c"
+            )[0]["c"]
+            if count == 0:
+                self._emb_names = []
+                self._emb_matrix = np.empty((0, 0), dtype=np.float32)
+                return self._emb_names, self._emb_matrix
+            if self.quantize_embeddings:
+                rows = self.iter_query(
+                    "MATCH (n) WHERE n.embedding_q8 IS NOT NULL "
+                    "RETURN n.name AS name, n.embedding_q8 AS embedding, "
+                    "n.embedding_scale AS scale",
+                    columns=["name", "embedding", "scale"],
+                )
+            else:
+                rows = self.iter_query(
+                    "MATCH (n) WHERE n.embedding IS NOT NULL "
+                    "RETURN n.name AS name, n.embedding AS embedding",
+                    columns=["name", "embedding"],
+                )
+            names: List[str] = []
+            matrix = None
+            scales = (np.empty(count, dtype=np.float32)
+                      if self.quantize_embeddings else None)
+            dtype = np.int8 if self.quantize_embeddings else np.float32
+            dim = None
+            n = 0
+            for row in rows:
+                if matrix is None:
+                    dim = len(row[1])
+                    matrix = np.empty((count, dim), dtype=dtype)
+                elif len(row[1]) != dim:
+                    # 모델 교체 등으로 차원이 다른 임베딩은 행렬에 못 들어간다
+                    # → 건너뛴다 (조회 측 차원 가드가 나머지를 처리)
+                    continue
+                names.append(row[0])
+                matrix[n] = row[1]
+                if scales is not None:
+                    scales[n] = row[2]
+                n += 1
+            if n < count:
+                matrix = matrix[:n]
+                if scales is not None:
+                    scales = scales[:n]
+            self._emb_names = names
+            self._emb_matrix = matrix
+            # 행별 노름은 조회마다 다시 계산하지 않도록 한 번만 계산해 둔다
+            # (기록 시 정규화된 임베딩이면 전부 ~1.0)
+            if self.quantize_embeddings:
+                self._emb_scales = scales
+                self._emb_norms = (
+                    np.linalg.norm(matrix.astype(np.float32), axis=1) * scales
+                )
+            else:
+                self._emb_norms = np.linalg.norm(matrix, axis=1)
+        return self._emb_names, self._emb_matrix
+
+    def _invalidate_embedding_cache(self):
+        self._emb_matrix = None
+        self._emb_names = None
+        self._emb_scales = None
+        self._emb_norms = None
+        self._ann = None  # 인덱스도 함께 무효화 (재구축 필요)
+
+    def build_ann_index(self, save_path: Optional[str] = None):
+        # 임베딩을 한 번 당겨와 hnswlib 인덱스를 만든다
+        # 이후 find_similar_entities가 서버 조회 없이 이 인덱스를 우선 사용
+        from ann_index import ANNIndex
+
+        names, matrix = self._load_embedding_cache()
+        if matrix.size == 0:
+            return None
+        if self.quantize_embeddings:
+            # hnswlib에는 역양자화한 float 행렬을 넣는다
+            matrix = matrix.astype(np.float32) * self._emb_scales[:, None]
+        ann = ANNIndex(dim=matrix.shape[1], max_elements=matrix.shape[0])
+        ann.add_items(matrix, list(range(len(names))))
+        if save_path:
+            ann.save(save_path)
+        self._ann = ann
+        return ann
+
+    def _brute_force_similar(self, query_embedding, query_norm: float,
+                             limit: int, threshold: float) -> List[Dict]:
+        # 행 단위 파이썬 루프 대신 (N, d)·(d,) GEMV 한 번으로 전부 계산한다
+        # (OpenBLAS SIMD 경로, 파이썬 객체 오버헤드 제거)
+        names, matrix = self._load_embedding_cache()
+        if matrix.size == 0:
+            return []
+        # 차원이 다른 임베딩(모델 교체 등)은 어차피 비교 불가 → 계산 전에 걸러낸다
+        if matrix.shape[1] != len(query_embedding):
+            return []
+
+        if self.quantize_embeddings:
+            # int8 내적 후 스케일 복원: dot(fp32) ≈ dot(int8) * scale_row * scale_q
+            q8, q_scale = quantize_embedding(query_embedding)
+            dot = (matrix.astype(np.int32) @ q8.astype(np.int32)).astype(np.float32)
+            sims = (dot * self._emb_scales * q_scale) / (self._emb_norms * query_norm + 1e-12)
+        else:
+            # 질의를 한 번만 단위 벡터로 만들고 캐시된 행 노름으로 나눈다
+            # (저장 임베딩은 기록 시 정규화돼 있어 사실상 M @ q 한 번이면 끝)
+            query_vec = np.asarray(query_embedding, dtype=np.float32) / query_norm
+            sims = (matrix @ query_vec) / (self._emb_norms + 1e-12)
+
+        idx = np.where(sims >= threshold)[0]
+        if idx.size == 0:
+            return []
+        # 전체 정렬 대신 top-k만 부분 선택 후 k개만 정렬
+        k = min(limit, idx.size)
+        top = idx[np.argpartition(-sims[idx], k - 1)[:k]]
+        top = top[np.argsort(-sims[top])]
+        return [{"name": names[i], "similarity": float(sims[i])} for i in top]